@@ -3,79 +3,598 @@ Text Processor for Web App Integration
 Accepts command-line arguments and outputs JSON to stdout
 """
 
+import asyncio
+import hashlib
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
 import argparse
-from typing import Dict, Any
-from openai import OpenAI
-from dotenv import load_dotenv
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import msgspec
+from tenacity import (AsyncRetrying, retry_if_exception, stop_after_attempt,
+                      stop_after_delay, wait_random_exponential)
 
-# Load environment variables
-load_dotenv()
+# The OpenAI SDK, httpx, diskcache and python-dotenv are imported when a
+# processor is created, so --help and argument errors return without paying
+# for their (several hundred ms) import time
+
+# Shared keep-alive connection pool, created on first use, so every request
+# reuses open TLS connections instead of handshaking again. Connections
+# belong to the event loop that opened them, so the pool is per loop.
+_HTTP = None
+_HTTP_LOOP = None
+
+
+class AllTasksResult(msgspec.Struct):
+    """Output of the fused "all" task: every task's result for one text"""
+    summary: str
+    key_points: List[str]
+    classification: str
+    classification_reason: str
+
+
+class Result(msgspec.Struct):
+    """Outcome of processing one text, as written to stdout"""
+    success: bool
+    task: Optional[str]
+    input: Union[str, List[str], None]
+    output: Union[str, AllTasksResult, None] = None
+    error: Optional[str] = None
+
+
+# Supported tasks. Each one is run by _call_openai_api with its template from
+# prompts.json; add a task here and a matching template to support it.
+# Each task runs on the cheapest model that handles it well (override with
+# MODEL_FOR_<TASK>, e.g. MODEL_FOR_CLASSIFY), and max_tokens is sized to the
+# task's expected output rather than a flat cap.
+TASKS: Dict[str, Dict[str, Any]] = {
+    "summarize": {"description": "Summarize the given text",
+                  "model": "gpt-4o", "max_tokens": 300},
+    "extract_key_points": {"description": "Extract key points from the given text",
+                           "model": "gpt-4o", "max_tokens": 400},
+    "classify": {"description": "Classify the given text as Opinion, Fact, or News",
+                 "model": "gpt-4o-mini", "max_tokens": 150},
+    # Reads the text once and returns all three results as one JSON object
+    "all": {"description": "Run every task in a single call, returning JSON",
+            "model": "gpt-4o", "max_tokens": 900,
+            "response_format": {"type": "json_object"},
+            "output_type": AllTasksResult},
+}
+
+# USD per 1M tokens (input, output) for --dry-run cost estimates
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4": (30.00, 60.00),
+}
+
+# Processors reused by repeated invocations within the same Python process,
+# keyed by use_cache
+_PROCESSORS: Dict[bool, "WebTextProcessor"] = {}
+
+
+def _get_http_client():
+    """Return the pooled httpx client for the running event loop"""
+    global _HTTP, _HTTP_LOOP
+    loop = asyncio.get_running_loop()
+    if _HTTP is None or _HTTP_LOOP is not loop:
+        import httpx
+
+        _HTTP = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=32,
+                                max_connections=64, keepalive_expiry=30),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            http2=True
+        )
+        _HTTP_LOOP = loop
+    return _HTTP
+
+
+async def _close_http_client() -> None:
+    """Close the running loop's pooled connections before the loop ends"""
+    global _HTTP, _HTTP_LOOP
+    if _HTTP is not None and _HTTP_LOOP is asyncio.get_running_loop():
+        await _HTTP.aclose()
+        _HTTP = _HTTP_LOOP = None
+
+
+def _run(main):
+    """Run a coroutine with asyncio.run, closing pooled connections afterwards"""
+    async def run_and_close():
+        try:
+            return await main
+        finally:
+            await _close_http_client()
+
+    return asyncio.run(run_and_close())
+
+
+def _invalid_task_error(task: str) -> str:
+    """Error message for a task name that isn't in TASKS"""
+    return f"Invalid task: {task}. Available tasks: {list(TASKS)}"
+
+
+def _is_transient_error(exc: BaseException) -> bool:
+    """Whether an OpenAI error is worth retrying (rate limit, timeout, 5xx)"""
+    from openai import (APIConnectionError, APITimeoutError,
+                        InternalServerError, RateLimitError)
+
+    return isinstance(exc, (RateLimitError, APITimeoutError,
+                            APIConnectionError, InternalServerError))
+
+
+class SemanticCache:
+    """In-memory nearest-neighbour cache of responses, one index per task"""
+
+    def __init__(self, threshold: float):
+        """Initialize empty per-task indexes"""
+        # Imported here, not at module level, so --help skips FAISS startup
+        import faiss
+        import numpy as np
+
+        self._faiss = faiss
+        self._np = np
+        self.threshold = threshold
+        self._indexes: Dict[str, Any] = {}
+        self._responses: Dict[str, List[str]] = {}
+
+    def _as_vector(self, embedding: List[float]):
+        """Convert an embedding to a unit-length float32 row vector"""
+        vector = self._np.asarray([embedding], dtype='float32')
+        self._faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(self, task: str, embedding: List[float]) -> Optional[str]:
+        """Return the cached response of the closest match above threshold"""
+        index = self._indexes.get(task)
+        if index is None or index.ntotal == 0:
+            return None
+
+        scores, ids = index.search(self._as_vector(embedding), 1)
+        if scores[0][0] >= self.threshold:
+            return self._responses[task][ids[0][0]]
+        return None
+
+    def add(self, task: str, embedding: List[float], response: str) -> None:
+        """Store a response under its input embedding"""
+        vector = self._as_vector(embedding)
+        if task not in self._indexes:
+            self._indexes[task] = self._faiss.IndexFlatIP(vector.shape[1])
+            self._responses[task] = []
+
+        self._indexes[task].add(vector)
+        self._responses[task].append(response)
 
 
 class WebTextProcessor:
     """Text processor optimized for web app integration"""
 
-    def __init__(self):
-        """Initialize the TextProcessor with OpenAI client"""
+    def __init__(self, use_cache: bool = True, offline: bool = False):
+        """Initialize the TextProcessor with the async OpenAI client
+
+        An offline processor only renders prompts and estimates tokens, so
+        it doesn't need an API key.
+        """
+        # Only read .env when the environment (e.g. the Node server) hasn't
+        # already provided the key
+        if 'OPENAI_API_KEY' not in os.environ:
+            from dotenv import load_dotenv
+            load_dotenv()
+
         api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+        if not api_key and not offline:
             raise ValueError(
                 "OPENAI_API_KEY not found in environment variables.")
 
-        self.client = OpenAI(api_key=api_key)
-        print("Using OpenAI client", file=sys.stderr)
+        # The client and semaphore are created per event loop, see _bind_loop
+        self._api_key = api_key
+        self._loop = None
+        self._aclient = None
+        self._semaphore = None
+        if not offline:
+            print("Using async OpenAI client", file=sys.stderr)
 
-        self.tasks = {
-            "summarize": self.summarize,
-            "extract_key_points": self.extract_key_points,
-            "classify": self.classify
+        # Bound in-flight API calls so concurrent batches stay under the
+        # account's rate limits
+        self.set_concurrency(int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")))
+
+        # Seconds one text may spend on API calls, retries included. Kept
+        # under the Node server's 30s deadline so the worker gives up first.
+        self.request_timeout = float(os.getenv("OPENAI_REQUEST_TIMEOUT", "20"))
+
+        # Identical requests are answered from disk instead of the API
+        self._cache = None
+        self._cache_ttl = int(os.getenv("PROMPT_CACHE_TTL", "86400"))
+        if use_cache:
+            import diskcache
+            self._cache = diskcache.Cache(
+                os.getenv("PROMPT_CACHE_DIR", "/tmp/ptp_cache"))
+
+        self.models = {
+            task: os.getenv(f"MODEL_FOR_{task.upper()}", config["model"])
+            for task, config in TASKS.items()
         }
 
+        # Inputs longer than this are cut before prompting; the tokenizer is
+        # loaded on first use
+        self.max_input_tokens = int(os.getenv("MAX_INPUT_TOKENS", "6000"))
+        self._encodings: Dict[str, Any] = {}
+        self._encoding_retry_at: Dict[str, float] = {}
+        self._encoding_lock = threading.Lock()
+        self._system_tokens: Dict[str, Tuple[int, bool]] = {}
+
+        # Near-duplicate inputs are answered from earlier responses
+        self.embedding_model = os.getenv(
+            "EMBEDDING_MODEL", "text-embedding-3-small")
+        self._semantic = SemanticCache(
+            float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))) if use_cache else None
+
         # Load prompts from configuration file
         self.prompts = self._load_prompts()
         self.system_prompt = self.prompts["system"]
 
+        # Move each task's static instructions (everything before the final
+        # '---') into its system message. Every call for a task then starts
+        # with the same bytes, which the API can prefix-cache. Only the short
+        # trailing payload with {text} goes in the user message.
+        self.task_system_prompts = {}
+        self._payloads: Dict[str, Tuple[str, str]] = {}
+        self._render: Dict[str, Callable[[str], str]] = {}
+        for task in TASKS:
+            instructions, _, payload = self.prompts[task].rpartition("\n---\n")
+            self.task_system_prompts[task] = (
+                f"{self.system_prompt}\n\n{instructions.strip()}"
+                if instructions.strip() else self.system_prompt)
+            self._payloads[task] = self._split_payload(payload.strip())
+            self._render[task] = self._compile_payload(payload.strip())
+
+    def set_concurrency(self, limit: int) -> None:
+        """Replace the API concurrency limit before a batch is started"""
+        if limit < 1:
+            raise ValueError("Concurrency must be at least 1.")
+        self._concurrency = limit
+        self._loop = None
+
+    def _bind_loop(self) -> None:
+        """Create the API client and semaphore for the running event loop
+
+        Both are tied to the loop that first uses them, so a processor reused
+        under a later asyncio.run gets fresh ones.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if not self._api_key:
+            raise ValueError(
+                "OPENAI_API_KEY not found in environment variables.")
+
+        # Retries are handled by tenacity in _create_completion
+        from openai import AsyncOpenAI
+        self._aclient = AsyncOpenAI(api_key=self._api_key,
+                                    http_client=_get_http_client(), max_retries=0)
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._loop = loop
+
+    @property
+    def aclient(self):
+        """AsyncOpenAI client for the running event loop"""
+        self._bind_loop()
+        return self._aclient
+
+    @property
+    def _sem(self) -> asyncio.Semaphore:
+        """Concurrency limit for API calls on the running event loop"""
+        self._bind_loop()
+        return self._semaphore
+
     def get_prompt_template(self, task: str, text: str) -> str:
-        """Get prompt template from local templates"""
-        return self.prompts[task].format(text=text)
-
-    def summarize(self, text: str) -> str:
-        """Summarize the given text"""
-        prompt = self.get_prompt_template("summarize", text)
-        return self._call_openai_api(prompt)
-
-    def extract_key_points(self, text: str) -> str:
-        """Extract key points from the given text"""
-        prompt = self.get_prompt_template("extract_key_points", text)
-        return self._call_openai_api(prompt)
-
-    def classify(self, text: str) -> str:
-        """Classify the given text as Opinion, Fact, or News"""
-        prompt = self.get_prompt_template("classify", text)
-        return self._call_openai_api(prompt)
-
-    def _call_openai_api(self, prompt: str) -> str:
-        """Make API call to OpenAI and return the response"""
-        try:
-            # Make the OpenAI API call
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-
-            return response.choices[0].message.content.strip()
+        """Get the user message: the task's payload template filled with text"""
+        return self._render[task](self._truncate(text, self.models[task]))
+
+    @staticmethod
+    def _split_payload(template: str) -> Tuple[str, str]:
+        """Split a payload template into the text before and after {text}"""
+        head, _, tail = template.partition("{text}")
+        # Keep str.format's handling of escaped braces
+        return (head.replace("{{", "{").replace("}}", "}"),
+                tail.replace("{{", "{").replace("}}", "}"))
+
+    @classmethod
+    def _compile_payload(cls, template: str) -> Callable[[str], str]:
+        """Split a payload template on {text} once, returning a render function
+
+        Concatenating the two halves avoids re-parsing the template with
+        str.format on every call.
+        """
+        head, tail = cls._split_payload(template)
+        return lambda text: head + text + tail
+
+    def _input_from_request(self, task: str, body: Dict[str, Any]) -> Optional[str]:
+        """Recover the (possibly truncated) input text from a request body"""
+        if task not in self._payloads:
+            return None
+        head, tail = self._payloads[task]
+        content = body["messages"][-1]["content"]
+        if (len(content) < len(head) + len(tail)
+                or not content.startswith(head) or not content.endswith(tail)):
+            return None
+        return content[len(head):len(content) - len(tail)]
+
+    def _get_encoding(self, model: str):
+        """Return the tiktoken encoding for a model, or None if unavailable
+
+        A failed load is retried after a minute rather than on every call.
+        """
+        if model in self._encodings:
+            return self._encodings[model]
+        if time.monotonic() < self._encoding_retry_at.get(model, 0):
+            return None
+
+        # Concurrent loads of the same BPE file wait for the first one
+        with self._encoding_lock:
+            if (model not in self._encodings
+                    and time.monotonic() >= self._encoding_retry_at.get(model, 0)):
+                try:
+                    import tiktoken
+                    self._encodings[model] = tiktoken.encoding_for_model(model)
+                except Exception as e:
+                    # tiktoken downloads its BPE files on first use, which can
+                    # fail offline; callers fall back to a character estimate
+                    print(f"Tokenizer unavailable for {model}: {e}", file=sys.stderr)
+                    self._encoding_retry_at[model] = time.monotonic() + 60
+        return self._encodings.get(model)
+
+    async def _load_encoding(self, model: str) -> None:
+        """Load a model's tokenizer in a thread, off the event loop
+
+        tiktoken fetches its BPE file with a blocking download on first use,
+        which would otherwise stall every in-flight request.
+        """
+        if model not in self._encodings:
+            await asyncio.to_thread(self._get_encoding, model)
+
+    def _count_tokens(self, text: str, model: str) -> Tuple[int, bool]:
+        """Count tokens in text, returning (count, exact)"""
+        encoding = self._get_encoding(model)
+        if encoding is None:
+            return -(-len(text) // 4), False
+        return len(encoding.encode(text, disallowed_special=())), True
+
+    def estimate(self, text: str, task: str) -> Dict[str, Any]:
+        """Estimate prompt tokens and worst-case cost locally, without an API call
+
+        The cost assumes the completion uses all of the task's max_tokens, so
+        it is an upper bound.
+        """
+        model = self.models[task]
+        if task not in self._system_tokens:
+            self._system_tokens[task] = self._count_tokens(
+                self.task_system_prompts[task], model)
+        system_tokens, system_exact = self._system_tokens[task]
+        user_tokens, user_exact = self._count_tokens(
+            self.get_prompt_template(task, text), model)
+
+        # Chat formatting adds about 3 tokens per message plus 3 to prime
+        # the reply
+        prompt_tokens = system_tokens + user_tokens + 2 * 3 + 3
+        max_completion_tokens = TASKS[task]["max_tokens"]
+
+        est_cost_usd = None
+        if model in MODEL_PRICES:
+            input_price, output_price = MODEL_PRICES[model]
+            est_cost_usd = round(
+                (prompt_tokens * input_price
+                 + max_completion_tokens * output_price) / 1_000_000, 6)
+
+        return {
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "max_completion_tokens": max_completion_tokens,
+            "est_cost_usd": est_cost_usd,
+            "exact": system_exact and user_exact
+        }
+
+    def _fits_input_budget(self, text: str) -> bool:
+        """Whether text is certainly within max_input_tokens, without tokenizing"""
+        # Byte-level BPE gives every token at least one UTF-8 byte, so text
+        # with no more bytes than the budget can't be over. Characters can
+        # be several tokens each (CJK, emoji), so a character count won't do.
+        return len(text.encode('utf-8')) <= self.max_input_tokens
+
+    def _truncate(self, text: str, model: str) -> str:
+        """Cut text to max_input_tokens, keeping the beginning"""
+        if self._fits_input_budget(text):
+            return text
+
+        encoding = self._get_encoding(model)
+        if encoding is None:
+            # Roughly four characters per token for English text
+            return text[:self.max_input_tokens * 4]
+
+        ids = encoding.encode(text, disallowed_special=())
+        if len(ids) <= self.max_input_tokens:
+            return text
+        return encoding.decode(ids[:self.max_input_tokens])
+
+    def _build_request(self, task: str, text: str) -> Dict[str, Any]:
+        """Build the chat completion request body for a task"""
+        return {
+            "model": self.models[task],
+            "messages": [
+                {"role": "system", "content": self.task_system_prompts[task]},
+                {"role": "user", "content": self.get_prompt_template(task, text)}
+            ],
+            "max_tokens": TASKS[task]["max_tokens"],
+            "temperature": 0.7,
+            **({"response_format": TASKS[task]["response_format"]}
+               if "response_format" in TASKS[task] else {})
+        }
+
+    async def _call_openai_api(self, task: str, text: str,
+                               on_delta: Optional[Callable[[str], None]] = None
+                               ) -> Union[str, AllTasksResult]:
+        """Make API call to OpenAI and return the response
+
+        Tasks with an output_type return the decoded struct. When on_delta is
+        given the completion is streamed and on_delta is called with each
+        chunk of text as it arrives; cached responses are passed to it in one
+        piece.
+        """
+        if not self._fits_input_budget(text):
+            await self._load_encoding(self.models[task])
+        request = self._build_request(task, text)
+
+        key = self._cache_key(request) if self._cache is not None else None
+        if key is not None:
+            cached = self._cache.get(key)
+            if cached is not None:
+                try:
+                    output = self._decode_output(task, cached)
+                    if on_delta is not None:
+                        on_delta(cached)
+                    return output
+                except ValueError:
+                    # Written before replies were validated; call the API again
+                    self._cache.delete(key)
+
+        # A text holds one concurrency slot from its embedding through its
+        # last retry. request_timeout starts once the slot is acquired, so
+        # texts queued behind a large batch aren't failed before being sent.
+        async with self._sem:
+            try:
+                return await asyncio.wait_for(
+                    self._fetch_output(task, text, request, key, on_delta),
+                    self.request_timeout)
+            except asyncio.TimeoutError:
+                raise Exception(
+                    f"OpenAI API Error: no response within {self.request_timeout:g}s")
 
+    async def _fetch_output(self, task: str, text: str, request: Dict[str, Any],
+                            key: Optional[str],
+                            on_delta: Optional[Callable[[str], None]] = None
+                            ) -> Union[str, AllTasksResult]:
+        """Answer a request from the semantic cache or the API, caching the reply"""
+        embedding = None
+        if self._semantic is not None:
+            # Embed the input as the prompt sends it, so long texts stay under
+            # the embedding model's token limit
+            embedding = await self._embed(self._truncate(text, self.models[task]))
+            if embedding is not None:
+                similar = self._semantic.lookup(task, embedding)
+                if similar is not None:
+                    if on_delta is not None:
+                        on_delta(similar)
+                    return self._decode_output(task, similar)
+
+        try:
+            content, finish_reason = await self._create_completion(request, on_delta)
         except Exception as e:
             raise Exception(f"OpenAI API Error: {str(e)}")
 
+        # Only replies that decode are cached, so a bad one isn't served
+        # again for the whole TTL
+        output = self._decode_output(task, content, finish_reason)
+
+        if key is not None:
+            self._cache.set(key, content, expire=self._cache_ttl)
+        if embedding is not None:
+            self._semantic.add(task, embedding, content)
+        return output
+
+    @staticmethod
+    def _decode_output(task: str, content: str,
+                       finish_reason: Optional[str] = None) -> Union[str, AllTasksResult]:
+        """Decode a reply into the task's output_type, raising ValueError if invalid
+
+        A structured reply that stopped at max_tokens is rejected, since its
+        JSON is cut off.
+        """
+        output_type = TASKS[task].get("output_type")
+        if output_type is None:
+            return content
+        if finish_reason == "length":
+            raise ValueError(
+                f"Response for {task} was cut off at max_tokens "
+                f"({TASKS[task]['max_tokens']})")
+        try:
+            return msgspec.json.decode(content, type=output_type)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Invalid {task} response: {e}")
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed the input text, or return None if the call fails"""
+        try:
+            response = await self.aclient.embeddings.create(
+                model=self.embedding_model, input=text)
+            return response.data[0].embedding
+        except Exception as e:
+            # The semantic cache is an optimisation; fall through to the API
+            print(f"Skipping semantic cache: {e}", file=sys.stderr)
+            return None
+
+    async def _create_completion(self, request: Dict[str, Any],
+                                 on_delta: Optional[Callable[[str], None]] = None
+                                 ) -> Tuple[str, Optional[str]]:
+        """Make the OpenAI API call, returning (content, finish_reason)
+
+        Transient failures are retried with backoff until request_timeout.
+        """
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(5) | stop_after_delay(self.request_timeout),
+            wait=wait_random_exponential(min=1, max=8),
+            retry=retry_if_exception(_is_transient_error),
+            reraise=True)
+        return await retrying(self._complete_once, request, on_delta)
+
+    async def _complete_once(self, request: Dict[str, Any],
+                             on_delta: Optional[Callable[[str], None]] = None
+                             ) -> Tuple[str, Optional[str]]:
+        """Make one chat completion attempt, streaming to on_delta if given"""
+        if on_delta is None:
+            response = await self.aclient.chat.completions.create(**request)
+            choice = response.choices[0]
+            return (choice.message.content or "").strip(), choice.finish_reason
+
+        # Retryable errors surface when the stream is opened, before any
+        # delta has been emitted, so a retry never repeats output
+        stream = await self.aclient.chat.completions.create(
+            **request, stream=True)
+        parts = []
+        finish_reason = None
+        # Whitespace is held back until more text follows, so the emitted
+        # deltas join up to exactly the stripped output
+        held = ""
+        started = False
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+
+            if not started:
+                delta = delta.lstrip()
+                started = bool(delta)
+            body = delta.rstrip()
+            if body:
+                on_delta(held + body)
+                held = delta[len(body):]
+            else:
+                held += delta
+
+        return "".join(parts).strip(), finish_reason
+
+    @staticmethod
+    def _cache_key(request: Dict[str, Any]) -> str:
+        """Hash the full request so any change to it misses the cache"""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
     def _load_prompts(self) -> Dict[str, str]:
         """Load prompts from configuration file (JSON)"""
         script_dir = os.path.dirname(__file__)
@@ -100,69 +619,348 @@ class WebTextProcessor:
             raise FileNotFoundError(
                 f"Prompts file not found: {json_file}. Please ensure it exists.")
 
-    def process_text(self, text: str, task: str) -> Dict[str, Any]:
-        """Process text using the selected task"""
-        if task not in self.tasks:
-            return {
-                "success": False,
-                "error": f"Invalid task: {task}. Available tasks: {list(self.tasks.keys())}",
-                "task": task,
-                "input": text,
-                "output": None
-            }
+    async def process_text(self, text: str, task: str,
+                           on_delta: Optional[Callable[[str], None]] = None) -> Result:
+        """Process text using the selected task, streaming to on_delta if given"""
+        if task not in TASKS:
+            return Result(
+                success=False, task=task, input=text,
+                error=_invalid_task_error(task))
 
         try:
-            task_function = self.tasks[task]
-            output = task_function(text)
-
-            return {
-                "success": True,
-                "task": task,
-                "input": text,
-                "output": output
-            }
+            output = await self._call_openai_api(task, text, on_delta)
+            return Result(success=True, task=task, input=text, output=output)
 
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "task": task,
-                "input": text,
-                "output": None
-            }
+            return Result(success=False, task=task, input=text, error=str(e))
+
+    async def aprocess_batch(self, items: List[Tuple[str, str]]) -> List[Result]:
+        """Process (text, task) pairs concurrently and return results in order"""
+        coros = [self.process_text(text, task) for text, task in items]
+        results = await asyncio.gather(*coros, return_exceptions=True)
+
+        return [
+            result if not isinstance(result, BaseException) else
+            Result(success=False, task=task, input=text, error=str(result))
+            for (text, task), result in zip(items, results)
+        ]
+
+    async def submit_batch(self, items: List[Tuple[str, str]]) -> str:
+        """Submit (text, task) pairs to the OpenAI Batch API, returning the batch id
+
+        Batch jobs finish within 24 hours at a discount, for bulk work such as
+        eval reruns or backfills that don't need an interactive response.
+        """
+        for _, task in items:
+            if task not in TASKS:
+                raise ValueError(_invalid_task_error(task))
+        for model in {self.models[task] for text, task in items
+                      if not self._fits_input_budget(text)}:
+            await self._load_encoding(model)
+
+        lines = [
+            _dumps({
+                "custom_id": f"{index}:{task}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._build_request(task, text)
+            })
+            for index, (text, task) in enumerate(items)
+        ]
+
+        with tempfile.NamedTemporaryFile('w+b', suffix='.jsonl') as f:
+            f.write(b"\n".join(lines) + b"\n")
+            f.seek(0)
+            batch_file = await self.aclient.files.create(file=f, purpose="batch")
+
+        batch = await self.aclient.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"Submitted batch {batch.id} with {len(items)} requests", file=sys.stderr)
+        return batch.id
+
+    async def poll_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Check a batch and, once completed, download its results in input order
+
+        Results have the same shape as realtime ones; each input is read back
+        from the batch's request file.
+        """
+        batch = await self.aclient.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            return {"batch_id": batch_id, "status": batch.status, "results": None}
+
+        inputs: Dict[str, Optional[str]] = {}
+        if batch.input_file_id:
+            content = await self.aclient.files.content(batch.input_file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    request = msgspec.json.decode(line)
+                    task = request["custom_id"].partition(":")[2]
+                    inputs[request["custom_id"]] = self._input_from_request(
+                        task, request["body"])
+
+        results = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.aclient.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    results.append(self._parse_batch_line(
+                        msgspec.json.decode(line), inputs))
+
+        results.sort(key=lambda item: item[0])
+        return {"batch_id": batch_id, "status": batch.status,
+                "results": [result for _, result in results]}
+
+    def _parse_batch_line(self, line: Dict[str, Any],
+                          inputs: Dict[str, Optional[str]]) -> Tuple[int, Result]:
+        """Convert one Batch API output line into its input index and Result"""
+        index, _, task = line["custom_id"].partition(":")
+        text = inputs.get(line["custom_id"])
+        response = line.get("response") or {}
+        error = line.get("error")
+
+        if not error and response.get("status_code") == 200:
+            choice = response["body"]["choices"][0]
+            try:
+                output = self._decode_output(
+                    task, (choice["message"]["content"] or "").strip(),
+                    choice.get("finish_reason"))
+            except ValueError as e:
+                return int(index), Result(success=False, task=task, input=text,
+                                          error=str(e))
+            return int(index), Result(success=True, task=task, input=text,
+                                      output=output)
+
+        if not error:
+            error = response.get("body", {}).get("error")
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        return int(index), Result(success=False, task=task, input=text,
+                                  error=f"OpenAI API Error: {message}")
+
+
+def _load_items(args) -> List[Tuple[str, str]]:
+    """Build (text, task) pairs from --text values or a --jsonl file"""
+    if args.text:
+        return [(text, args.task) for text in args.text]
+
+    items = []
+    with open(args.jsonl, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = msgspec.json.decode(line)
+            items.append((record["text"], record.get("task", args.task)))
+    return items
+
+
+def get_processor(use_cache: bool = True) -> "WebTextProcessor":
+    """Return the shared processor for use_cache, creating it on first use"""
+    if use_cache not in _PROCESSORS:
+        _PROCESSORS[use_cache] = WebTextProcessor(use_cache=use_cache)
+    return _PROCESSORS[use_cache]
+
+
+async def run(args) -> List[Result]:
+    """Run every requested item concurrently on the shared processor"""
+    processor = get_processor(use_cache=not args.no_cache)
+    if args.concurrency is not None:
+        processor.set_concurrency(args.concurrency)
+    if args.stream:
+        text, task = _load_items(args)[0]
+        return [await processor.process_text(
+            text, task, lambda delta: _write_line({"delta": delta}))]
+    return await processor.aprocess_batch(_load_items(args))
+
+
+def run_estimate(args) -> List[Dict[str, Any]]:
+    """Estimate tokens and cost for every requested item without calling the API"""
+    processor = WebTextProcessor(use_cache=False, offline=True)
+    results = []
+    for text, task in _load_items(args):
+        if task not in TASKS:
+            results.append({"success": False, "task": task, "input": text,
+                            "error": _invalid_task_error(task)})
+            continue
+        results.append({"success": True, "task": task, "input": text,
+                        **processor.estimate(text, task)})
+    return results
+
+
+async def run_batch(args) -> Dict[str, Any]:
+    """Submit a Batch API job, or poll one when --batch-id is given"""
+    processor = get_processor(use_cache=False)
+    if args.batch_id:
+        return {"success": True, **await processor.poll_batch(args.batch_id)}
+
+    batch_id = await processor.submit_batch(_load_items(args))
+    return {"success": True, "batch_id": batch_id, "status": "submitted"}
+
+
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize dicts and Result structs to UTF-8 JSON bytes"""
+    data = msgspec.json.encode(obj)
+    return msgspec.json.format(data, indent=2) if indent else data
+
+
+def _write_line(message: Any, indent: bool = False) -> None:
+    """Write one JSON document plus newline to stdout and flush it immediately"""
+    sys.stdout.buffer.write(_dumps(message, indent) + b"\n")
+    sys.stdout.buffer.flush()
+
+
+async def _serve_request(processor: Optional["WebTextProcessor"],
+                         startup_error: Optional[str], line: str) -> None:
+    """Process one worker request and write its JSON line to stdout"""
+    request: Dict[str, Any] = {}
+    try:
+        request = msgspec.json.decode(line, type=Dict[str, Any])
+        if not (isinstance(request.get("text"), str)
+                and isinstance(request.get("task"), str)):
+            raise ValueError('Request must have string "text" and "task" fields')
+        if processor is None:
+            raise RuntimeError(startup_error)
+
+        on_delta = None
+        if request.get("stream"):
+            def on_delta(delta: str) -> None:
+                _write_line({"id": request.get("id"), "delta": delta})
+
+        result = await processor.process_text(
+            request["text"], request["task"], on_delta)
+    except Exception as e:
+        result = Result(success=False, task=request.get("task"),
+                        input=request.get("text"), error=str(e))
+
+    _write_line({"id": request.get("id"), **msgspec.structs.asdict(result)})
+
+
+async def serve(use_cache: bool = True, concurrency: Optional[int] = None) -> None:
+    """Process JSON line requests from stdin until EOF
+
+    Each request is {"id": ..., "text": ..., "task": ...}; each response is
+    the process_text result plus the request id, written as one JSON line.
+    Requests with "stream": true first get {"id": ..., "delta": ...} lines.
+    Requests run concurrently, so responses may arrive out of order.
+    """
+    processor = None
+    startup_error = None
+    try:
+        processor = get_processor(use_cache=use_cache)
+        if concurrency is not None:
+            processor.set_concurrency(concurrency)
+    except Exception as e:
+        processor = None
+        # Keep serving so each request gets a JSON error instead of EOF
+        startup_error = str(e)
+
+    loop = asyncio.get_running_loop()
+    pending = set()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+
+        job = asyncio.create_task(_serve_request(processor, startup_error, line))
+        pending.add(job)
+        job.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending)
 
 
 def main():
     """Main function for command-line usage"""
     parser = argparse.ArgumentParser(
         description='Process text using OpenAI API')
-    parser.add_argument('--task', required=True,
-                        choices=['summarize',
-                                 'extract_key_points', 'classify'],
-                        help='Task to perform')
-    parser.add_argument('--text', required=True, help='Text to process')
+    parser.add_argument('--task',
+                        choices=list(TASKS),
+                        help='Task to perform: ' + '; '.join(
+                            f"{name} - {config['description']}"
+                            for name, config in TASKS.items()))
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--text', action='append',
+                        help='Text to process (repeat to process several texts concurrently)')
+    source.add_argument('--jsonl',
+                        help='JSONL file of {"text": ..., "task": ...} records to process concurrently')
+    parser.add_argument('--concurrency', type=int,
+                        help='Maximum concurrent OpenAI requests '
+                             '(default: $OPENAI_MAX_CONCURRENCY or 8)')
+    parser.add_argument('--mode', choices=['realtime', 'batch'],
+                        default='realtime',
+                        help='realtime: call the API now; batch: submit to the '
+                             'discounted 24h Batch API (default: realtime)')
+    parser.add_argument('--batch-id',
+                        help='With --mode batch, poll this batch and print its '
+                             'results once completed')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always call the API instead of reusing cached '
+                             'responses')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream {"delta": ...} JSON lines as the output is '
+                             'generated, then the final result as one JSON line')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print estimated prompt tokens and cost without '
+                             'calling the API')
+    parser.add_argument('--serve', action='store_true',
+                        help='Run as a long-lived worker reading JSON line '
+                             'requests from stdin')
 
     args = parser.parse_args()
 
+    if args.serve:
+        _run(serve(use_cache=not args.no_cache, concurrency=args.concurrency))
+        return
+
+    # Polling an existing batch is the only mode that needs no input
+    if not (args.mode == 'batch' and args.batch_id):
+        if args.task is None:
+            parser.error("the following arguments are required: --task")
+        if not args.text and not args.jsonl:
+            parser.error("one of the arguments --text --jsonl is required")
+    if args.stream and (args.mode == 'batch' or not args.text or len(args.text) > 1):
+        parser.error("--stream requires a single --text in realtime mode")
+
+    if args.dry_run:
+        try:
+            results = run_estimate(args)
+            _write_line(results[0] if len(results) == 1 else results, indent=True)
+            sys.exit(0 if all(result["success"] for result in results) else 1)
+        except Exception as e:
+            _write_line({"success": False, "error": str(e)}, indent=True)
+            sys.exit(1)
+
+    if args.mode == 'batch':
+        try:
+            _write_line(_run(run_batch(args)), indent=True)
+            sys.exit(0)
+        except Exception as e:
+            _write_line({"success": False, "error": str(e)}, indent=True)
+            sys.exit(1)
+
     try:
-        processor = WebTextProcessor()
-        result = processor.process_text(args.text, args.task)
+        results = _run(run(args))
 
-        # Output JSON to stdout for Node.js to capture
-        print(json.dumps(result, indent=2))
+        # Output JSON to stdout for Node.js to capture; a single input keeps
+        # the original single-object shape
+        output = results[0] if len(results) == 1 else results
+        # Streams are NDJSON, so their final result stays on one line
+        _write_line(output, indent=not args.stream)
 
         # Exit with appropriate code
-        sys.exit(0 if result["success"] else 1)
+        sys.exit(0 if all(result.success for result in results) else 1)
 
     except Exception as e:
-        error_result = {
-            "success": False,
-            "error": str(e),
-            "task": args.task,
-            "input": args.text,
-            "output": None
-        }
-        print(json.dumps(error_result, indent=2))
+        error_result = Result(
+            success=False, task=args.task,
+            input=args.text[0] if args.text and len(args.text) == 1 else args.text,
+            error=str(e))
+        _write_line(error_result, indent=not args.stream)
         sys.exit(1)
 
 
@@ -29,66 +29,191 @@ app.use('/api/', limiter);
 const PYTHON_SCRIPT_PATH = path.join(__dirname, 'script', 'web_text_processor.py');
 const PYTHON_EXECUTABLE = process.env.PYTHON_PATH;
 
+// Persistent Python worker state
+let pythonWorker = null;
+let nextRequestId = 0;
+const pendingRequests = new Map();
+
 /**
- * Execute Python script with given parameters
- * @param {string} text - Text to process
- * @param {string} task - Task to perform
- * @returns {Promise} Promise that resolves with the result
+ * Reject every in-flight request sent to a worker, e.g. after it exits
+ * @param {ChildProcess} worker - Worker whose requests failed
+ * @param {Error} error - Error to reject with
  */
-function executePythonScript(text, task) {
-  return new Promise((resolve, reject) => {
-    const pythonProcess = spawn(PYTHON_EXECUTABLE, [
-      PYTHON_SCRIPT_PATH,
-      '--task', task,
-      '--text', text
-    ], {
-      cwd: path.join(__dirname, 'script'),
-      env: { ...process.env }
-    });
+function rejectPendingRequests(worker, error) {
+  for (const [id, pending] of pendingRequests) {
+    if (pending.worker === worker) {
+      pendingRequests.delete(id);
+      clearTimeout(pending.timer);
+      pending.reject(error);
+    }
+  }
+}
+
+/**
+ * Get the long-lived Python worker, spawning it on first use
+ * The worker reads JSON lines from stdin and answers with JSON lines
+ * tagged with the request id, so Python startup and TLS setup are paid once
+ * @returns {ChildProcess} Running worker process
+ */
+function getPythonWorker() {
+  if (pythonWorker) {
+    return pythonWorker;
+  }
 
-    let stdout = '';
-    let stderr = '';
+  const worker = spawn(PYTHON_EXECUTABLE, [PYTHON_SCRIPT_PATH, '--serve'], {
+    cwd: path.join(__dirname, 'script'),
+    env: { ...process.env }
+  });
 
-    pythonProcess.stdout.on('data', (data) => {
-      stdout += data.toString();
-    });
+  let stdoutBuffer = '';
+  let stderr = '';
 
-    pythonProcess.stderr.on('data', (data) => {
-      stderr += data.toString();
-    });
+  // Decode as a stream so multi-byte UTF-8 characters split across chunks
+  // survive; the worker writes raw UTF-8 rather than ASCII escapes
+  worker.stdout.setEncoding('utf8');
+  worker.stdout.on('data', (data) => {
+    stdoutBuffer += data;
 
-    pythonProcess.on('close', (code) => {
-      if (code === 0) {
-        try {
-          const result = JSON.parse(stdout);
-          resolve(result);
-        } catch (error) {
-          reject(new Error(`Failed to parse Python output: ${error.message}`));
+    let newlineIndex;
+    while ((newlineIndex = stdoutBuffer.indexOf('\n')) !== -1) {
+      const line = stdoutBuffer.slice(0, newlineIndex);
+      stdoutBuffer = stdoutBuffer.slice(newlineIndex + 1);
+      if (!line.trim()) {
+        continue;
+      }
+
+      let result;
+      try {
+        result = JSON.parse(line);
+      } catch (error) {
+        console.error(`Failed to parse Python output: ${error.message}`);
+        continue;
+      }
+
+      const pending = pendingRequests.get(result.id);
+      if (!pending) {
+        continue;
+      }
+
+      if ('delta' in result && !('success' in result)) {
+        // Partial output of a streaming request
+        if (pending.onDelta) {
+          pending.onDelta(result.delta);
         }
-      } else {
-        reject(new Error(`Python script failed with code ${code}: ${stderr}`));
+        continue;
       }
-    });
 
-    pythonProcess.on('error', (error) => {
-      reject(new Error(`Failed to start Python process: ${error.message}`));
-    });
+      pendingRequests.delete(result.id);
+      clearTimeout(pending.timer);
+      pending.resolve(result);
+    }
+  });
+
+  worker.stderr.on('data', (data) => {
+    // Keep only recent diagnostics for error messages
+    stderr = (stderr + data.toString()).slice(-4096);
+  });
 
-    // Set timeout for long-running processes
-    setTimeout(() => {
-      pythonProcess.kill();
+  // Write failures surface through the 'close'/'error' handlers below
+  worker.stdin.on('error', () => {});
+
+  worker.on('close', (code) => {
+    if (pythonWorker === worker) {
+      pythonWorker = null;
+    }
+    rejectPendingRequests(worker, new Error(`Python script failed with code ${code}: ${stderr}`));
+  });
+
+  worker.on('error', (error) => {
+    if (pythonWorker === worker) {
+      pythonWorker = null;
+    }
+    rejectPendingRequests(worker, new Error(`Failed to start Python process: ${error.message}`));
+  });
+
+  // Don't let an idle worker keep the Node process alive
+  worker.unref();
+  worker.stdin.unref();
+  worker.stdout.unref();
+  worker.stderr.unref();
+
+  pythonWorker = worker;
+  return worker;
+}
+
+/**
+ * Execute Python script with given parameters
+ * @param {string} text - Text to process
+ * @param {string} task - Task to perform
+ * @param {Function} [onDelta] - If given, output is streamed and this is called with each chunk
+ * @returns {Promise} Promise that resolves with the result
+ */
+function executePythonScript(text, task, onDelta) {
+  return new Promise((resolve, reject) => {
+    const worker = getPythonWorker();
+    const id = String(++nextRequestId);
+
+    // Set timeout for long-running requests. The worker gives up on API
+    // calls before this, so a request still running here means the worker
+    // is stuck: kill it and let the next request spawn a fresh one
+    const timer = setTimeout(() => {
+      pendingRequests.delete(id);
       reject(new Error('Python script execution timed out'));
+      if (pythonWorker === worker) {
+        pythonWorker = null;
+      }
+      worker.kill();
     }, 30000); // 30 seconds timeout
+
+    pendingRequests.set(id, { resolve, reject, timer, onDelta, worker });
+    worker.stdin.write(JSON.stringify({ id, text, task, stream: Boolean(onDelta) }) + '\n');
   });
 }
 
+/**
+ * Validate the body of a text processing request
+ * @param {*} text - Text to process
+ * @param {*} task - Task to perform
+ * @returns {Object|null} { error, code } describing the first problem, or null if valid
+ */
+function validateProcessRequest(text, task) {
+  if (!text || typeof text !== 'string') {
+    return { error: 'Text is required and must be a string', code: 'INVALID_TEXT' };
+  }
+
+  if (!task || typeof task !== 'string') {
+    return { error: 'Task is required and must be a string', code: 'INVALID_TASK' };
+  }
+
+  // Validate task type
+  const validTasks = ['summarize', 'extract_key_points', 'classify'];
+  if (!validTasks.includes(task)) {
+    return {
+      error: `Invalid task. Must be one of: ${validTasks.join(', ')}`,
+      code: 'INVALID_TASK_TYPE'
+    };
+  }
+
+  // Validate text length
+  if (text.length > 10000) {
+    return { error: 'Text is too long. Maximum 10,000 characters allowed.', code: 'TEXT_TOO_LONG' };
+  }
+
+  if (text.trim().length === 0) {
+    return { error: 'Text cannot be empty', code: 'EMPTY_TEXT' };
+  }
+
+  return null;
+}
+
 // Routes
 app.get('/', (req, res) => {
   res.json({
     message: 'Text Processor Backend API',
     version: '1.0.0',
     endpoints: {
-      process: 'POST /api/process'
+      process: 'POST /api/process',
+      processStream: 'POST /api/process/stream'
     }
   });
 });
@@ -105,48 +230,9 @@ app.post('/api/process', async (req, res) => {
   try {
     const { text, task } = req.body;
 
-    // Validation
-    if (!text || typeof text !== 'string') {
-      return res.status(400).json({
-        success: false,
-        error: 'Text is required and must be a string',
-        code: 'INVALID_TEXT'
-      });
-    }
-
-    if (!task || typeof task !== 'string') {
-      return res.status(400).json({
-        success: false,
-        error: 'Task is required and must be a string',
-        code: 'INVALID_TASK'
-      });
-    }
-
-    // Validate task type
-    const validTasks = ['summarize', 'extract_key_points', 'classify'];
-    if (!validTasks.includes(task)) {
-      return res.status(400).json({
-        success: false,
-        error: `Invalid task. Must be one of: ${validTasks.join(', ')}`,
-        code: 'INVALID_TASK_TYPE'
-      });
-    }
-
-    // Validate text length
-    if (text.length > 10000) {
-      return res.status(400).json({
-        success: false,
-        error: 'Text is too long. Maximum 10,000 characters allowed.',
-        code: 'TEXT_TOO_LONG'
-      });
-    }
-
-    if (text.trim().length === 0) {
-      return res.status(400).json({
-        success: false,
-        error: 'Text cannot be empty',
-        code: 'EMPTY_TEXT'
-      });
+    const validationError = validateProcessRequest(text, task);
+    if (validationError) {
+      return res.status(400).json({ success: false, ...validationError });
     }
 
     // Execute Python script
@@ -177,6 +263,66 @@ app.post('/api/process', async (req, res) => {
   }
 });
 
+app.post('/api/process/stream', (req, res) => {
+  const { text, task } = req.body;
+
+  const validationError = validateProcessRequest(text, task);
+  if (validationError) {
+    return res.status(400).json({ success: false, ...validationError });
+  }
+
+  // Server-sent events: 'data' messages carry output deltas, followed by
+  // a single 'done' or 'error' event
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive'
+  });
+
+  // Stop writing once the client goes away. The response's 'close' fires on
+  // disconnect; the request's fires as soon as its body has been read
+  let clientGone = false;
+  res.on('close', () => {
+    clientGone = true;
+  });
+
+  const sendEvent = (event, data) => {
+    if (clientGone) {
+      return;
+    }
+    if (event) {
+      res.write(`event: ${event}\n`);
+    }
+    res.write(`data: ${JSON.stringify(data)}\n\n`);
+  };
+
+  executePythonScript(text, task, (delta) => sendEvent(null, { delta }))
+    .then((result) => {
+      if (result.success) {
+        sendEvent('done', { success: true, output: result.output });
+      } else {
+        sendEvent('error', {
+          success: false,
+          error: result.error || 'Processing failed',
+          code: 'PROCESSING_ERROR'
+        });
+      }
+    })
+    .catch((error) => {
+      console.error('Error in /api/process/stream:', error);
+      sendEvent('error', {
+        success: false,
+        error: error.message || 'Internal server error',
+        code: 'PROCESSING_ERROR'
+      });
+    })
+    .finally(() => {
+      if (!clientGone) {
+        res.end();
+      }
+    });
+});
+
 // Error handling middleware
 app.use((err, req, res, next) => {
   console.error('Unhandled error:', err);
@@ -263,6 +263,42 @@ describe('API Integration Tests', () => {
     });
   });
 
+  describe('POST /api/process/stream', () => {
+    test('should reject invalid task type before streaming', async () => {
+      const response = await request(app)
+        .post('/api/process/stream')
+        .send({ text: 'Sample text', task: 'invalid_task' })
+        .expect(400);
+
+      expect(response.body).toMatchObject(fixtures.errorResponses.invalidTaskType);
+    });
+
+    test('should reject text that is too long before streaming', async () => {
+      const response = await request(app)
+        .post('/api/process/stream')
+        .send({ text: 'a'.repeat(10001), task: 'summarize' })
+        .expect(400);
+
+      expect(response.body).toMatchObject(fixtures.errorResponses.textTooLong);
+    });
+
+    test('should respond with server-sent events', async () => {
+      const response = await request(app)
+        .post('/api/process/stream')
+        .send({ text: 'Sample text', task: 'summarize' })
+        .buffer(true)
+        .parse((res, callback) => {
+          let body = '';
+          res.on('data', (chunk) => { body += chunk.toString(); });
+          res.on('end', () => callback(null, body));
+        })
+        .expect('Content-Type', /text\/event-stream/)
+        .expect(200);
+
+      expect(response.body).toMatch(/event: (done|error)\ndata: /);
+    });
+  });
+
   describe('404 Handler', () => {
     test('should return 404 for unknown routes', async () => {
       const response = await request(app)
@@ -110,7 +110,8 @@ module.exports = {
         message: 'Text Processor Backend API',
         version: '1.0.0',
         endpoints: {
-            process: 'POST /api/process'
+            process: 'POST /api/process',
+            processStream: 'POST /api/process/stream'
         }
     }
 };
@@ -5,6 +5,7 @@
 
 const { describe, test, expect, beforeAll } = require('@jest/globals');
 const { spawn } = require('child_process');
+const http = require('http');
 const path = require('path');
 const fs = require('fs');
 
@@ -22,12 +23,16 @@ describe('Python Script Tests', () => {
     /**
      * Helper function to execute Python script
      */
-    const executePythonScript = (args) => {
+    const executePythonScript = (args, input) => {
         return new Promise((resolve, reject) => {
             const process = spawn(pythonExecutable, [scriptPath, ...args], {
                 cwd: path.dirname(scriptPath)
             });
 
+            if (input !== undefined) {
+                process.stdin.end(input);
+            }
+
             let stdout = '';
             let stderr = '';
 
@@ -319,6 +324,148 @@ describe('Python Script Tests', () => {
         });
     });
 
+    describe('Concurrent Batches', () => {
+        test('should not time out texts queued behind the concurrency limit', async () => {
+            // Local stand-in for the OpenAI API that answers each completion after 500ms
+            const server = http.createServer((req, res) => {
+                req.resume();
+                req.on('end', () => setTimeout(() => {
+                    res.writeHead(200, { 'Content-Type': 'application/json' });
+                    res.end(JSON.stringify({
+                        id: 'chatcmpl-test',
+                        object: 'chat.completion',
+                        created: 0,
+                        model: 'gpt-4o',
+                        choices: [{
+                            index: 0,
+                            message: { role: 'assistant', content: 'Summary' },
+                            finish_reason: 'stop'
+                        }],
+                        usage: { prompt_tokens: 1, completion_tokens: 1, total_tokens: 2 }
+                    }));
+                }, 500));
+            });
+            await new Promise((resolve) => server.listen(0, '127.0.0.1', resolve));
+
+            // Ten texts at two at a time take 2.5s, longer than the 1.5s per-text budget
+            const overrides = {
+                OPENAI_API_KEY: 'test-api-key',
+                OPENAI_BASE_URL: `http://127.0.0.1:${server.address().port}/v1`,
+                OPENAI_REQUEST_TIMEOUT: '1.5'
+            };
+            const originalEnv = {};
+            for (const [name, value] of Object.entries(overrides)) {
+                originalEnv[name] = process.env[name];
+                process.env[name] = value;
+            }
+
+            let result;
+            try {
+                const texts = Array.from({ length: 10 }, (_, i) => ['--text', `Batch text ${i}`]).flat();
+                result = await executePythonScript([
+                    '--task', 'summarize', '--no-cache', '--concurrency', '2', ...texts
+                ]);
+            } finally {
+                for (const [name, value] of Object.entries(originalEnv)) {
+                    if (value === undefined) {
+                        delete process.env[name];
+                    } else {
+                        process.env[name] = value;
+                    }
+                }
+                server.close();
+            }
+
+            expect(result.code).toBe(0);
+
+            const output = JSON.parse(result.stdout);
+            expect(output).toHaveLength(10);
+            for (const item of output) {
+                expect(item.success).toBe(true);
+                expect(item.output).toBe('Summary');
+            }
+        });
+    });
+
+    describe('Dry Run', () => {
+        test('should estimate tokens and cost without an API key', async () => {
+            const originalApiKey = process.env.OPENAI_API_KEY;
+            delete process.env.OPENAI_API_KEY;
+
+            const result = await executePythonScript([
+                '--dry-run',
+                '--task', 'classify',
+                '--text', 'The Federal Reserve raised interest rates by 0.25% today.'
+            ]);
+
+            if (originalApiKey) {
+                process.env.OPENAI_API_KEY = originalApiKey;
+            }
+
+            expect(result.code).toBe(0);
+
+            const output = JSON.parse(result.stdout);
+            expect(output.success).toBe(true);
+            expect(output.task).toBe('classify');
+            expect(output.model).toBe('gpt-4o-mini');
+            expect(output.prompt_tokens).toBeGreaterThan(0);
+            expect(output.max_completion_tokens).toBe(150);
+            expect(output.est_cost_usd).toBeGreaterThan(0);
+        });
+    });
+
+    describe('Worker Mode', () => {
+        /**
+         * Run the worker on the given stdin lines and parse its output lines
+         */
+        const serve = async (lines) => {
+            const result = await executePythonScript(['--serve'], lines.join('\n') + '\n');
+            expect(result.code).toBe(0);
+            return result.stdout.trim().split('\n').map((line) => JSON.parse(line));
+        };
+
+        test('should answer each request with its id', async () => {
+            const responses = await serve([
+                JSON.stringify({ id: 'a', text: 'First text', task: 'invalid_task' }),
+                JSON.stringify({ id: 'b', text: 'Second text', task: 'other_task' })
+            ]);
+
+            expect(responses).toHaveLength(2);
+            const byId = Object.fromEntries(responses.map((response) => [response.id, response]));
+            expect(byId.a.input).toBe('First text');
+            expect(byId.a.task).toBe('invalid_task');
+            expect(byId.b.input).toBe('Second text');
+            expect(byId.b.task).toBe('other_task');
+        });
+
+        test('should report an invalid task', async () => {
+            const [response] = await serve([
+                JSON.stringify({ id: '1', text: 'Test text', task: 'invalid_task' })
+            ]);
+
+            expect(response.id).toBe('1');
+            expect(response.success).toBe(false);
+            expect(response.error).toContain('Invalid task');
+            expect(response).toHaveProperty('output', null);
+        });
+
+        test('should report a line that is not a JSON object', async () => {
+            const [response] = await serve(['["not", "an", "object"]']);
+
+            expect(response.id).toBeNull();
+            expect(response.success).toBe(false);
+            expect(response.error).toBeTruthy();
+        });
+
+        test('should report a missing task field', async () => {
+            const [response] = await serve([JSON.stringify({ id: '1', text: 'Test text' })]);
+
+            expect(response.id).toBe('1');
+            expect(response.success).toBe(false);
+            expect(response.error).toContain('"task"');
+        });
+    });
+
     describe('Special Characters and Edge Cases', () => {
         test('should handle special characters in text', async () => {
             const result = await executePythonScript([
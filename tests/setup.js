@@ -11,6 +11,8 @@ process.env.NODE_ENV = 'test';
 process.env.PORT = '0';
 process.env.OPENAI_API_KEY = process.env.OPENAI_API_KEY || 'test-api-key';
 process.env.PYTHON_PATH = process.env.PYTHON_PATH || 'python3';
+// Give up on unreachable or rejected API calls quickly
+process.env.OPENAI_REQUEST_TIMEOUT = process.env.OPENAI_REQUEST_TIMEOUT || '5';
 
 // Global test timeout
 jest.setTimeout(30000);